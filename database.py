@@ -5,11 +5,12 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import List, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -21,12 +22,25 @@ db = None
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
+# One pooled client per process; zstd (falling back to zlib) compresses the wire protocol
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    _client = AsyncIOMotorClient(
+        database_url,
+        maxPoolSize=50,
+        minPoolSize=5,
+        maxIdleTimeMS=30000,
+        serverSelectionTimeoutMS=3000,
+        compressors="zstd,zlib",
+    )
     db = _client[database_name]
 
+def close_client():
+    """Close the shared client and its connection pool"""
+    if _client is not None:
+        _client.close()
+
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -40,16 +54,56 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def create_documents(collection_name: str, items: List[Union[BaseModel, dict]]):
+    """Insert documents with timestamps in one unordered batch.
+
+    Failed inserts (e.g. duplicate keys) don't stop the rest of the batch.
+    Returns the inserted ids and the indexes of the items that failed.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    if not items:
+        return [], []
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for item in items:
+        data_dict = item.model_dump() if isinstance(item, BaseModel) else item.copy()
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        docs.append(data_dict)
+
+    failed = set()
+    try:
+        await db[collection_name].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"] for err in e.details["writeErrors"]}
+    # insert_many assigns _id on each document client-side
+    inserted = [str(doc["_id"]) for i, doc in enumerate(docs) if i not in failed]
+    return inserted, sorted(failed)
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None, sort: dict = None, batch_size: int = None):
+    """Get documents from collection, with `_id` returned as a string `id` field
+
+    Bounded queries fetch in a single batch (`batch_size` defaults to `limit`).
+    """
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
+
+    pipeline = [{"$match": filter_dict or {}}]
+    if sort:
+        pipeline.append({"$sort": sort})
     if limit:
-        cursor = cursor.limit(limit)
-    
-    return list(cursor)
+        pipeline.append({"$limit": limit})
+    if projection:
+        pipeline.append({"$project": projection})
+    # rename server-side so documents come back in their final shape
+    pipeline += [{"$addFields": {"id": {"$toString": "$_id"}}}, {"$project": {"_id": 0}}]
+
+    batch_size = batch_size or limit
+    options = {"batchSize": batch_size} if batch_size else {}
+    cursor = db[collection_name].aggregate(pipeline, **options)
+    return await cursor.to_list(length=limit)
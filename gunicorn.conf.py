@@ -0,0 +1,14 @@
+"""
+Gunicorn config for production: `gunicorn main:app`
+
+Runs uvicorn workers (uvloop + httptools when installed) across all cores.
+Override the worker count with WEB_CONCURRENCY. Set REDIS_URL so the response
+cache (and its invalidation on writes) is shared between workers.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
@@ -1,29 +1,82 @@
+import base64
+import hashlib
+import hmac
+import logging
 import os
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
 from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.coder import Coder
+from fastapi_cache.decorator import cache
 from pydantic import BaseModel
+from cachetools import TTLCache
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+from redis import asyncio as aioredis
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from database import db, create_document, get_documents
+from database import db, close_client, create_document, create_documents, get_documents
+
+logger = logging.getLogger(__name__)
 
 # =====================
 # Auth / Security Setup
 # =====================
 SECRET_KEY = os.getenv("JWT_SECRET", "super-secret-key-change")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 12
+ACCESS_TOKEN_EXPIRE_SECONDS = 60 * 60 * 12
+
+# Hashes use passlib's "$pbkdf2-sha256$<rounds>$<salt>$<checksum>" format (adapted base64)
+PBKDF2_ROUNDS = 29000
+
+
+def _ab64_encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=").replace("+", ".")
+
+
+def _ab64_decode(data: str) -> bytes:
+    data = data.replace(".", "+")
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def hash_password(password: str, salt: Optional[bytes] = None, rounds: int = PBKDF2_ROUNDS) -> str:
+    salt = salt or os.urandom(16)
+    dk = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, rounds)
+    return f"$pbkdf2-sha256${rounds}${_ab64_encode(salt)}${_ab64_encode(dk)}"
+
+
+def _parse_password_hash(hashed: str):
+    _, scheme, rounds, salt, checksum = hashed.split("$")
+    if scheme != "pbkdf2-sha256":
+        raise ValueError(f"Unsupported password hash scheme: {scheme}")
+    return int(rounds), _ab64_decode(salt), _ab64_decode(checksum)
 
-# Use pbkdf2_sha256 to avoid external bcrypt dependency issues
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 # Seed admin credentials via env (for demo)
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@portfolio.dev")
+_ADMIN_EMAIL_LC = ADMIN_EMAIL.lower()
 # Support providing a precomputed hash; otherwise hash the provided password (short default)
-ADMIN_PASSWORD_HASH = os.getenv("ADMIN_PASSWORD_HASH") or pwd_context.hash(os.getenv("ADMIN_PASSWORD", "admin123"))
+ADMIN_PASSWORD_HASH = os.getenv("ADMIN_PASSWORD_HASH") or hash_password(os.getenv("ADMIN_PASSWORD", "admin123"))
+# Split once at startup so login only derives the candidate key
+_ADMIN_ROUNDS, _ADMIN_SALT, _ADMIN_DK = _parse_password_hash(ADMIN_PASSWORD_HASH)
+
+# Recently failed (email, password) digests, to absorb burst retries without re-running pbkdf2
+_failed_logins = TTLCache(maxsize=4096, ttl=0.2)
 
 class Token(BaseModel):
     access_token: str
@@ -88,155 +141,340 @@ class Education(BaseModel):
 # ==================
 # FastAPI app config
 # ==================
-app = FastAPI(title="Portfolio API")
+app = FastAPI(title="Portfolio API", default_response_class=ORJSONResponse)
+
+# Conditional GET (ETag / Last-Modified) for content reads, keyed by path prefix
+CONDITIONAL_GET_PREFIXES = {"/api/projects", "/api/tech", "/api/posts", "/api/experience", "/api/education"}
+GZIP_MINIMUM_SIZE = 1024
+
+
+class ConditionalGetMiddleware:
+    """Turns a 200 content read into a 304 when the client's validators still match.
+
+    Validators are computed once per rendered body (see content_response) and cached with it,
+    so a cache hit is answered without touching the DB, serializing or re-hashing.
+    Requests outside CONDITIONAL_GET_PREFIXES, or without validators, pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # "/api/projects/{slug}" matches on its "/api/projects" prefix
+        if scope["type"] != "http" or scope["method"] != "GET" or "/".join(scope["path"].split("/")[:3]) not in CONDITIONAL_GET_PREFIXES:
+            return await self.app(scope, receive, send)
+        request_headers = Headers(scope=scope)
+        if_none_match = request_headers.get("if-none-match")
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_none_match is None and if_modified_since is None:
+            return await self.app(scope, receive, send)
+
+        not_modified = False
+
+        async def send_304(message: Message):
+            nonlocal not_modified
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message["headers"]))
+                if message["status"] == 200 and _validators_match(headers, if_none_match, if_modified_since):
+                    not_modified = True
+                    # keep ETag/Last-Modified/Cache-Control/Vary, drop the entity headers
+                    size = int(headers.get("content-length", 0))
+                    del headers["content-length"]
+                    del headers["content-type"]
+                    # the 200 would have been gzipped (and so varied) by GZipMiddleware
+                    if size >= GZIP_MINIMUM_SIZE and "gzip" in request_headers.get("accept-encoding", ""):
+                        headers.add_vary_header("Accept-Encoding")
+                    message = {"type": "http.response.start", "status": 304, "headers": headers.raw}
+                await send(message)
+            elif not not_modified:
+                await send(message)
+            elif not message.get("more_body", False):
+                await send({"type": "http.response.body", "body": b""})
+
+        await self.app(scope, receive, send_304)
+
+
+def _validators_match(headers: MutableHeaders, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    # If-None-Match takes precedence; weak comparison ignores the W/ prefix
+    if if_none_match is not None:
+        etag = headers.get("etag")
+        if etag is None:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+    last_modified = headers.get("last-modified")
+    if last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+# registered before CORS/gzip so it runs inside them and 304s still carry CORS headers
+app.add_middleware(ConditionalGetMiddleware)
+
+# Explicit origins (comma separated) so browsers can cache preflights; "*" is invalid with credentials
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "https://portfolio.dev,http://localhost:5173").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    max_age=86400,
 )
+# listings repeat tags/tech/urls heavily and compress well; small bodies aren't worth it
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=4)
 
 # =========
 # Utilities
 # =========
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# Read endpoints are cached for CACHE_EXPIRE seconds in Redis (REDIS_URL) or, without it, in process
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_EXPIRE = 60
+
+# Login attempts are rate limited per client IP, shared across workers via REDIS_URL when set.
+# If Redis is down, limits fall back to in-process counters rather than failing every login.
+limiter = Limiter(key_func=get_remote_address, storage_uri=REDIS_URL, in_memory_fallback_enabled=True, swallow_errors=True)
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+
+def content_response(content) -> ORJSONResponse:
+    """Render a content read with its validators, computed once per rendered body.
+
+    Last-Modified is the render time: a cached body keeps the stamp it was rendered with,
+    so it never claims to be newer than the data it was built from. no-cache makes
+    browsers revalidate instead of guessing a freshness lifetime from Last-Modified.
+    """
+    response = ORJSONResponse(content, headers={
+        "Cache-Control": "no-cache",
+        "Last-Modified": format_datetime(datetime.now(timezone.utc), usegmt=True),
+    })
+    response.headers["ETag"] = f'W/"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+    return response
+
+
+class ORJSONResponseCoder(Coder):
+    """Caches the rendered body with its validators so hits skip serializing and hashing"""
+
+    @classmethod
+    def encode(cls, value: ORJSONResponse) -> bytes:
+        return b"\n".join([value.headers["etag"].encode(), value.headers["last-modified"].encode(), value.body])
+
+    @classmethod
+    def decode(cls, value: bytes) -> Response:
+        etag, last_modified, body = value.split(b"\n", 2)
+        headers = {"Cache-Control": "no-cache", "ETag": etag.decode(), "Last-Modified": last_modified.decode()}
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def invalidate(collection_name: str):
+    await FastAPICache.clear(namespace=collection_name)
+
+
+def verify_password(plain_password: str) -> bool:
+    dk = hashlib.pbkdf2_hmac("sha256", plain_password.encode(), _ADMIN_SALT, _ADMIN_ROUNDS)
+    return hmac.compare_digest(dk, _ADMIN_DK)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    ttl = expires_delta.total_seconds() if expires_delta else ACCESS_TOKEN_EXPIRE_SECONDS
+    to_encode["exp"] = int(time.time() + ttl)
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+@lru_cache(maxsize=256)
+def _decode_token(token: str) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
 def get_current_admin(authorization: Optional[str] = Header(None)):
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
     token = authorization.split(" ", 1)[1]
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        role: str = payload.get("role")
-        if email != ADMIN_EMAIL or role != "admin":
-            raise HTTPException(status_code=403, detail="Forbidden")
-        return {"email": email, "role": role}
+        payload = _decode_token(token)
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    # the decode is cached, so expiry has to be re-checked on every request
+    exp = payload.get("exp")
+    if exp is None or exp <= time.time():
+        raise HTTPException(status_code=401, detail="Invalid token")
+    email: str = payload.get("sub")
+    role: str = payload.get("role")
+    if email != ADMIN_EMAIL or role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return {"email": email, "role": role}
+
+# ==================
+# Startup / Shutdown
+# ==================
+@app.on_event("startup")
+async def init_cache():
+    backend = RedisBackend(aioredis.from_url(REDIS_URL)) if REDIS_URL else InMemoryBackend()
+    FastAPICache.init(backend, prefix="portfolio", expire=CACHE_EXPIRE, coder=ORJSONResponseCoder)
+
+@app.on_event("startup")
+async def create_indexes():
+    if db is None:
+        return
+    indexes = [
+        # slug lookups are point queries; uniqueness also rejects duplicate slugs at insert
+        ("project", "slug", {"unique": True}),
+        ("blogpost", "slug", {"unique": True}),
+        ("techitem", "name", {}),
+        # backs the latest-posts listing
+        ("blogpost", [("created_at", -1)], {}),
+    ]
+    # a missing index only costs performance, so never let it stop the API from booting
+    for collection_name, keys, options in indexes:
+        try:
+            await db[collection_name].create_index(keys, **options)
+        except OperationFailure as e:
+            # e.g. existing duplicate slugs; the other indexes can still be built
+            logger.warning("Could not create index %s on %s: %s", keys, collection_name, e)
+        except PyMongoError as e:
+            logger.warning("Skipping index creation, database unavailable: %s", e)
+            return
+
+@app.on_event("shutdown")
+async def close_database():
+    close_client()
 
 # ======
 # Routes
 # ======
 @app.get("/")
-def root():
+async def root():
     return {"status": "ok", "service": "portfolio-api"}
 
 @app.get("/test")
-def test_database():
-    ok = bool(db)
+async def test_database():
+    ok = db is not None
     collections = []
     if ok:
         try:
-            collections = db.list_collection_names()
+            collections = await db.list_collection_names()
         except Exception:
             pass
     return {"backend": "running", "database": "connected" if ok else "not-available", "collections": collections[:10]}
 
 # Auth
 @app.post("/api/auth/login", response_model=Token)
-def login(data: LoginRequest):
-    if data.email.lower() != ADMIN_EMAIL.lower() or not verify_password(data.password, ADMIN_PASSWORD_HASH):
+@limiter.limit("5/minute")
+async def login(request: Request, data: LoginRequest):
+    attempt = hashlib.sha256(f"{data.email}\0{data.password}".encode()).digest()[:16]
+    # cheap checks stay on the loop; pbkdf2 releases the GIL, so it runs in the threadpool
+    if attempt in _failed_logins or data.email.lower() != _ADMIN_EMAIL_LC or not await run_in_threadpool(verify_password, data.password):
+        _failed_logins[attempt] = True
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_access_token({"sub": ADMIN_EMAIL, "role": "admin"})
     return Token(access_token=token)
 
 # Projects
-@app.get("/api/projects")
-def list_projects():
-    items = get_documents("project") if db else []
-    # normalize _id to string
-    for it in items:
-        it["id"] = str(it.get("_id"))
-        it.pop("_id", None)
-    return items
-
-@app.get("/api/projects/{slug}")
-def get_project(slug: str):
-    items = get_documents("project", {"slug": slug}) if db else []
+# Fields needed to render a project card; detail fields are served by get_project
+PROJECT_CARD_FIELDS = {"title": 1, "slug": 1, "summary": 1, "tags": 1, "tech": 1, "cover": 1, "logo": 1}
+
+# Read endpoints return DB documents as ORJSONResponse directly (content_response), skipping FastAPI's jsonable_encoder pass
+
+@app.get("/api/projects", response_model=None)
+@cache(namespace="project")
+async def list_projects():
+    items = await get_documents("project", projection=PROJECT_CARD_FIELDS) if db is not None else []
+    return content_response(items)
+
+@app.get("/api/projects/{slug}", response_model=None)
+@cache(namespace="project")
+async def get_project(slug: str):
+    items = await get_documents("project", {"slug": slug}, limit=1) if db is not None else []
     if not items:
         raise HTTPException(status_code=404, detail="Not found")
-    it = items[0]
-    it["id"] = str(it.get("_id"))
-    it.pop("_id", None)
-    return it
+    return content_response(items[0])
 
 @app.post("/api/projects")
-def create_project(project: Project, _: dict = Depends(get_current_admin)):
-    _id = create_document("project", project)
+async def create_project(project: Project, _: dict = Depends(get_current_admin)):
+    try:
+        _id = await create_document("project", project)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Slug already exists")
+    await invalidate("project")
     return {"id": _id}
 
+@app.post("/api/projects/bulk")
+async def bulk_create_projects(projects: List[Project], _: dict = Depends(get_current_admin)):
+    inserted, failed = await create_documents("project", projects)
+    if inserted:
+        await invalidate("project")
+    # failures are almost always slugs that already exist
+    return {"ids": inserted, "skipped": [projects[i].slug for i in failed]}
+
 @app.put("/api/projects/{slug}")
-def update_project(slug: str, project: Project, _: dict = Depends(get_current_admin)):
-    if not db:
+async def update_project(slug: str, project: Project, _: dict = Depends(get_current_admin)):
+    if db is None:
         raise HTTPException(status_code=500, detail="Database not available")
-    res = db["project"].find_one_and_update({"slug": slug}, {"$set": project.model_dump(), "$currentDate": {"updated_at": True}}, return_document=True)
+    try:
+        # partial update: only fields the client actually sent are written
+        fields = project.model_dump(mode="python", exclude_unset=True, exclude_none=True)
+        res = await db["project"].find_one_and_update({"slug": slug}, {"$set": fields, "$currentDate": {"updated_at": True}}, projection={"_id": 1})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Slug already exists")
     if not res:
         raise HTTPException(status_code=404, detail="Not found")
+    await invalidate("project")
     return {"ok": True}
 
 @app.delete("/api/projects/{slug}")
-def delete_project(slug: str, _: dict = Depends(get_current_admin)):
-    if not db:
+async def delete_project(slug: str, _: dict = Depends(get_current_admin)):
+    if db is None:
         raise HTTPException(status_code=500, detail="Database not available")
-    res = db["project"].delete_one({"slug": slug})
+    res = await db["project"].delete_one({"slug": slug})
+    await invalidate("project")
     return {"deleted": res.deleted_count}
 
 # Tech
-@app.get("/api/tech")
-def list_tech():
-    items = get_documents("techitem") if db else []
-    for it in items:
-        it["id"] = str(it.get("_id"))
-        it.pop("_id", None)
-    return items
+@app.get("/api/tech", response_model=None)
+@cache(namespace="techitem")
+async def list_tech():
+    items = await get_documents("techitem") if db is not None else []
+    return content_response(items)
 
 @app.post("/api/tech")
-def create_tech(item: TechItem, _: dict = Depends(get_current_admin)):
-    _id = create_document("techitem", item)
+async def create_tech(item: TechItem, _: dict = Depends(get_current_admin)):
+    _id = await create_document("techitem", item)
+    await invalidate("techitem")
     return {"id": _id}
 
 # Blog
-@app.get("/api/posts")
-def list_posts():
-    items = get_documents("blogpost") if db else []
-    for it in items:
-        it["id"] = str(it.get("_id"))
-        it.pop("_id", None)
-    # latest three
-    items.sort(key=lambda x: x.get("created_at", datetime.utcnow()), reverse=True)
-    return items[:3]
+@app.get("/api/posts", response_model=None)
+@cache(namespace="blogpost")
+async def list_posts():
+    # latest three, sorted server-side; the listing only shows excerpts, so skip the full post body
+    items = await get_documents("blogpost", projection={"content": 0}, sort={"created_at": -1}, limit=3) if db is not None else []
+    return content_response(items)
 
 @app.post("/api/posts")
-def create_post(post: BlogPost, _: dict = Depends(get_current_admin)):
-    _id = create_document("blogpost", post)
+async def create_post(post: BlogPost, _: dict = Depends(get_current_admin)):
+    try:
+        _id = await create_document("blogpost", post)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Slug already exists")
+    await invalidate("blogpost")
     return {"id": _id}
 
 # Experience & Education (read-only listing endpoints)
-@app.get("/api/experience")
-def get_experience():
-    items = get_documents("experience") if db else []
-    for it in items:
-        it["id"] = str(it.get("_id"))
-        it.pop("_id", None)
-    return items
-
-@app.get("/api/education")
-def get_education():
-    items = get_documents("education") if db else []
-    for it in items:
-        it["id"] = str(it.get("_id"))
-        it.pop("_id", None)
-    return items
+@app.get("/api/experience", response_model=None)
+@cache(namespace="experience")
+async def get_experience():
+    items = await get_documents("experience") if db is not None else []
+    return content_response(items)
+
+@app.get("/api/education", response_model=None)
+@cache(namespace="education")
+async def get_education():
+    items = await get_documents("education") if db is not None else []
+    return content_response(items)